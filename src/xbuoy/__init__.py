@@ -44,6 +44,11 @@ from .geographic_filters import (
     box_filter_buoys,
 )
 
+from .downloads import (
+    clear_cache,
+    get_cache_dir,
+)
+
 __all__ = [
     "list_stations",       # Get station metadata
     "fetch_data",          # Download buoy data
@@ -59,4 +64,6 @@ __all__ = [
     "add_variable_coverage",
     "compute_data_coverage",
     "box_filter_buoys",
+    "clear_cache",
+    "get_cache_dir",
 ]
@@ -65,7 +65,8 @@ def fetch_data(
     station_ids: Union[str, List[str]],
     years: Union[int, List[int]],
     sample_rate: str = "D",
-    add_location: bool = True
+    add_location: bool = True,
+    reference_stations: Optional[xr.Dataset] = None
 ) -> xr.Dataset:
     """
     Fetch historical buoy data for specified stations and years.
@@ -84,6 +85,10 @@ def fetch_data(
         Options: "D" (daily), "W" (weekly), "M" (monthly), "H" (hourly).
     add_location : bool, optional
         Whether to add latitude/longitude coordinates to the dataset (default: True).
+    reference_stations : xr.Dataset, optional
+        Station dataset with latitude/longitude (e.g. from `list_stations`) used to
+        add locations. If None, locations are read from the NDBC station table, which
+        is downloaded once and then cached (see `clear_cache`).
 
     Returns
     -------
@@ -110,7 +115,7 @@ def fetch_data(
     """
     from .data_processing import add_latitude_longitude
     from .data_retrieval import get_station_records as _fetch_records
-    from .station_metadata import get_buoy_stations as _get_stations_metadata
+    from .station_metadata import _get_station_locations
 
     # Normalize inputs to lists
     if isinstance(station_ids, str):
@@ -130,7 +135,8 @@ def fetch_data(
 
     # Add location coordinates if requested
     if add_location:
-        reference_stations = _get_stations_metadata(data_format="xarray")
+        if reference_stations is None:
+            reference_stations = _get_station_locations()
         dataset = add_latitude_longitude(dataset, reference_stations)
 
     return dataset
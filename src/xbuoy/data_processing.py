@@ -24,12 +24,18 @@ def add_latitude_longitude(xsdf: xr.Dataset, reference_station_ds: xr.Dataset) -
     Returns
     -------
     xr.Dataset
-        Dataset with added latitude and longitude coordinates.
+        Dataset with added latitude and longitude coordinates. Stations missing
+        from the reference dataset get NaN coordinates.
     """
-    xsdf["latitude"] = reference_station_ds.sel(station_id=xsdf.station_id).latitude
-    xsdf["longitude"] = reference_station_ds.sel(station_id=xsdf.station_id).longitude
+    # Look up all stations at once and reuse the result for both variables
+    locations = reference_station_ds[["latitude", "longitude"]].reindex(
+        station_id=xsdf.station_id.values
+    )
 
-    return xsdf
+    return xsdf.assign(
+        latitude=("station_id", locations.latitude.data),
+        longitude=("station_id", locations.longitude.data)
+    )
 
 
 def add_variable_coverage(xsdf: xr.Dataset, varname: str = "WTMP") -> xr.Dataset:
@@ -53,9 +59,10 @@ def add_variable_coverage(xsdf: xr.Dataset, varname: str = "WTMP") -> xr.Dataset
     >>> ds = add_variable_coverage(ds, varname="WTMP")
     >>> ds = add_variable_coverage(ds, varname="WSPD")
     """
-    numerator = (~np.isnan(xsdf[varname])).sum(dim="time")
-    denominator = len(xsdf.time)
-    xsdf[f"{varname}_coverage"] = 100 * numerator / denominator
+    # count() skips NaN natively, without materializing a boolean mask
+    valid_count = xsdf[varname].count(dim="time")
+    coverage = 100 * valid_count / xsdf.sizes["time"]
+    xsdf[f"{varname}_coverage"] = coverage.astype(np.float32)
     xsdf[f"{varname}_coverage"].attrs["description"] = (
         f"percentage of existing {varname} data across specified interval length"
     )
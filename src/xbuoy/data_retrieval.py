@@ -5,51 +5,187 @@ This module provides functions to fetch historical observational data from NOAA
 including temperature, wave, wind, and other oceanographic measurements.
 """
 
+import io
+import logging
+import os
+import re
 import warnings
 import pandas as pd
 import numpy as np
 import xarray as xr
 import concurrent.futures
-import os
-from typing import List, Optional
+import functools
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple
 from tqdm import tqdm
 
+from .downloads import DATA_ERRORS, MAX_CONCURRENT_REQUESTS, get_session
+from .station_metadata import _available_historical
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional and only speeds up parsing
+    pa = pa_csv = None
+
 # Suppress deprecation warnings from ndbc_api
 warnings.filterwarnings('ignore', category=DeprecationWarning, module='ndbc_api')
 
+logger = logging.getLogger(__name__)
+
+
+# Column name mappings for date/time fields
+_DATE_COLUMNS = {
+    'YY': "year", "#YY": "year", "YYYY": "year",
+    'MM': "month", "DD": 'day', 'hh': 'hour', 'mm': "minute"
+}
+
+# Types of the standard meteorological columns, given to pyarrow so that columns are
+# not inferred as int64/float64 first and downcast afterwards
+_COLUMN_TYPES = {
+    "YY": "int16", "#YY": "int16", "YYYY": "int16",
+    "MM": "int8", "DD": "int8", "hh": "int8", "mm": "int8",
+    **{col: "float32" for col in ["WDIR", "WD", "WSPD", "GST", "WVHT", "DPD", "APD", "MWD",
+                                  "PRES", "BAR", "ATMP", "WTMP", "DEWP", "VIS", "TIDE"]}
+}
+
+# Values used by NDBC to mark missing observations
+MISSING_VALUES = (99, 999, 9999)
 
-def _get_api():
-    """Create the NDBC client only when data retrieval is requested."""
-    from ndbc_api import NdbcApi
+# Missing-value markers of the standard meteorological columns, so that valid
+# values such as a 99 degree wind direction or 999 hPa pressure are kept.
+# Temperatures accept both 99 and 999, which are out of range either way.
+_MISSING_VALUES_BY_COLUMN = {
+    **{col: (999,) for col in ["WDIR", "WD", "MWD"]},
+    **{col: (99,) for col in ["WSPD", "GST", "WVHT", "DPD", "APD", "VIS", "TIDE"]},
+    **{col: (9999,) for col in ["PRES", "BAR"]},
+    **{col: (99, 999) for col in ["ATMP", "WTMP", "DEWP"]}
+}
 
-    return NdbcApi()
 
+def _has_units_row(head: bytes) -> bool:
+    """Check whether the second line of an NDBC text file holds units rather than data."""
+    lines = head.split(b"\n", 2)
+    return len(lines) > 1 and re.search(rb"[A-Za-z]", lines[1]) is not None
 
-def has_extra_headers(url: str) -> bool:
+
+def _fetch_and_sniff(
+    url: str,
+    required_variable: Optional[str] = None
+) -> Optional[Tuple[bytes, bool]]:
     """
-    Check if the given URL's CSV file contains extra header rows.
+    Download an NDBC text file in a single streamed request.
 
-    Parameters
-    ----------
-    url : str
-        URL to the CSV file.
+    The header lines are inspected as soon as they arrive, so the format is known
+    without a second request, and the rest of the stream is appended to the same buffer.
+    If required_variable (e.g. "WTMP") is not among the columns, the download is
+    stopped after the header and None is returned.
 
     Returns
     -------
-    bool
-        True if the second line contains alphabetic characters, indicating extra headers.
+    tuple of (bytes, bool) or None
+        Contents of the file and whether it has a units row below the column names.
     """
-    # Read the first line of the file
-    first_line = pd.read_csv(url, delim_whitespace=True, nrows=1).values[0]
-    # Check if the second line has alphabetic characters, indicating headers
-    return any(~np.isreal(char) for char in first_line)
+    with get_session().get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        chunks = response.iter_content(chunk_size=64 * 1024)
+
+        buffer = io.BytesIO()
+        for chunk in chunks:
+            buffer.write(chunk)
+            if buffer.getvalue().count(b"\n") >= 2:
+                break
+        head = buffer.getvalue()
+
+        # Leaving the with block closes the connection without reading the body
+        if required_variable is not None:
+            columns = head.split(b"\n", 1)[0].split()
+            if required_variable.encode() not in columns:
+                return None
+
+        for chunk in chunks:
+            buffer.write(chunk)
+
+    return buffer.getvalue(), _has_units_row(head)
+
+
+def _parse_historical_text(body: bytes, has_units_row: Optional[bool] = None) -> pd.DataFrame:
+    """
+    Parse the contents of an NDBC historical text file.
+
+    Newer files have a second header row with units (e.g. "#yr mo dy hr mn degT"),
+    which is skipped. It is detected from the contents unless has_units_row is given.
+    The pyarrow CSV reader is used when available, otherwise pandas' C parser.
+    """
+    if has_units_row is None:
+        has_units_row = _has_units_row(body)
+
+    if pa_csv is not None:
+        # pyarrow needs a single-character delimiter, so collapse the column padding
+        text = re.sub(rb"[ \t]*\r?\n[ \t]*", b"\n", body.strip())
+        text = re.sub(rb"[ \t]+", b" ", text)
+        column_types = {col: pa.type_for_alias(dtype) for col, dtype in _COLUMN_TYPES.items()}
+        try:
+            table = pa_csv.read_csv(
+                io.BytesIO(text),
+                read_options=pa_csv.ReadOptions(skip_rows_after_names=int(has_units_row)),
+                parse_options=pa_csv.ParseOptions(delimiter=" "),
+                convert_options=pa_csv.ConvertOptions(column_types=column_types)
+            )
+            return table.to_pandas()
+        except pa.ArrowInvalid as e:
+            # Irregular files (e.g. ragged rows) are left to the more lenient pandas parser
+            logger.debug(f"pyarrow could not parse file, falling back to pandas: {e}")
+
+    return pd.read_csv(
+        io.BytesIO(body),
+        sep=r"\s+",
+        skiprows=[1] if has_units_row else None,
+        engine="c"
+    )
+
+
+def _mask_missing_values(sdf: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace NDBC missing-value markers with NaN in the observation columns.
+
+    Date columns are left untouched, so that e.g. the two-digit year 99 survives.
+    Known columns only use their own markers; other columns use MISSING_VALUES.
+    Observations are stored as float32, which keeps the precision of NDBC data.
+    """
+    obs_cols = [col for col in sdf.columns if col not in _DATE_COLUMNS]
+    values = sdf[obs_cols].to_numpy(dtype=np.float32)
+    for i, col in enumerate(obs_cols):
+        column = values[:, i]
+        column[np.isin(column, _MISSING_VALUES_BY_COLUMN.get(col, MISSING_VALUES))] = np.nan
+
+    return sdf.assign(**{col: values[:, i] for i, col in enumerate(obs_cols)})
+
+
+def _compose_datetimes(sdf: pd.DataFrame) -> np.ndarray:
+    """
+    Build datetime64[ns] values from the year, month, day, hour and minute columns.
+
+    Uses NumPy datetime arithmetic, which is much faster than pd.to_datetime on a
+    DataFrame of date parts.
+    """
+    year, month, day, hour, minute = (
+        sdf[col].to_numpy(dtype=np.int64) for col in ["year", "month", "day", "hour", "minute"]
+    )
+    # Months and days are incompatible NumPy units, so go through datetime64[D]
+    dates = ((year - 1970).astype("datetime64[Y]") + (month - 1).astype("timedelta64[M]"))
+    dates = dates.astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+
+    times = dates + hour.astype("timedelta64[h]") + minute.astype("timedelta64[m]")
+    return times.astype("datetime64[ns]")
 
 
 def extract_historical_year(
     yr: int,
     station_id: str = 'tplm2',
     sample_rate: str = "D",
-    display_error: bool = False
+    display_error: bool = False,
+    required_variable: Optional[str] = None
 ) -> Optional[xr.Dataset]:
     """
     Extract and process historical data for a specific year and station.
@@ -64,7 +200,11 @@ def extract_historical_year(
         Resampling rate for pandas resample (default is daily "D").
         Examples: "D" (daily), "W" (weekly), "M" (monthly).
     display_error : bool, optional
-        Whether to print error messages (default is False).
+        Whether to print error messages (default is False). This also skips
+        files without water temperature, unless required_variable is given.
+    required_variable : str, optional
+        Variable the file must contain, e.g. "WTMP". Files without it are skipped
+        after reading their header, without downloading the rest.
 
     Returns
     -------
@@ -72,34 +212,68 @@ def extract_historical_year(
         Processed data resampled to the specified sample rate.
         Returns None if data extraction fails.
     """
-    try:
-        api = _get_api()
-        # Column name mappings for date/time fields
-        replace_names = {
-            'YY': "year", "#YY": "year", "YYYY": "year",
-            'MM': "month", "DD": 'day', 'hh': 'hour', 'mm': "minute"
-        }
+    sdf = _read_historical_year(yr, station_id, display_error, required_variable=required_variable)
+    if sdf is None or sdf.empty:
+        return None
+    # Averages of NDBC observations (0.1 resolution at best) fit in float32
+    return sdf.resample(sample_rate).mean(numeric_only=True).astype(np.float32).to_xarray()
+
+
+def _historical_links(station_id: str) -> Dict[str, str]:
+    """
+    Look up the text-file URL of each year of historical data for a station.
+
+    Returns
+    -------
+    dict
+        Mapping of year (as a string, e.g. "2020") to URL.
+    """
+    # The listing is shared with get_historical_bounds, so metadata lookups followed
+    # by data retrieval only fetch it once
+    return {
+        year: link.replace("download_data", "view_text_file")
+        for year, link in _available_historical(station_id).items() if year.isdigit()
+    }
 
-        # Fetch available historical data as a DataFrame
-        historical_df = api.available_historical(station_id=station_id, as_df=True)
 
+def _read_historical_year(
+    yr: int,
+    station_id: str,
+    display_error: bool = False,
+    slink: Optional[str] = None,
+    required_variable: Optional[str] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Download one year of station data as a DataFrame indexed by time, not resampled.
+
+    The file URL can be given as slink when it is already known, which avoids
+    looking up the station's historical links again. Returns None if data
+    extraction fails, and an empty DataFrame if the file has no required_variable
+    column, so that skipped files are not reported as failures.
+    See `extract_historical_year`.
+    """
+    try:
         # Get the link for the specific year
-        slink = historical_df[str(int(yr))].iloc[0]
-        slink = slink.replace("download_data", "view_text_file")
+        if slink is None:
+            slink = _historical_links(station_id)[str(int(yr))]
+
+        # With display_error, files without water temperature have always been skipped
+        if required_variable is None and display_error:
+            required_variable = "WTMP"
 
-        # Check if the file has extra headers and read it accordingly
-        if has_extra_headers(slink):
-            sdf = pd.read_csv(slink, delimiter=r"\s+", skiprows=[1])
-        else:
-            sdf = pd.read_csv(slink, delimiter=r"\s+")
+        # Download the file once, stopping early if the required variable is missing
+        fetched = _fetch_and_sniff(slink, required_variable)
+        if fetched is None:
+            logger.debug("%s not found for station %s, year %s", required_variable, station_id, yr)
+            if display_error:
+                print(f"{required_variable} not found for station {station_id}, year {yr}")
+            return pd.DataFrame()
 
-        # If "WTMP" (water temperature) is not in the columns, return None
-        if ("WTMP" not in sdf.columns) and display_error:
-            print(f"WTMP not found for station {station_id}, year {yr}")
-            return None
+        # Parse the file, skipping the units row if present
+        sdf = _parse_historical_text(*fetched)
 
         # Replace invalid values (99, 999, 9999) with NaN
-        sdf = sdf.replace([99, 999, 9999], np.nan)
+        sdf = _mask_missing_values(sdf)
 
         # Adjust year column if it uses a two-digit format
         if "YY" in sdf.columns:
@@ -110,29 +284,138 @@ def extract_historical_year(
         sdf["hh"] = 1 if 'hh' not in sdf.columns else sdf["hh"]
 
         # Rename columns based on the mapping dictionary
-        sdf = sdf.rename(columns=replace_names)
+        sdf = sdf.rename(columns=_DATE_COLUMNS)
 
         # Convert the date-related columns to a datetime object
         dt_cols = ["year", "month", "day", "hour", "minute"]
-        sdf['time'] = pd.to_datetime(sdf[dt_cols])
+        sdf['time'] = _compose_datetimes(sdf)
 
         # Drop date-related columns and set 'time' as the index
         sdf = sdf.drop(columns=dt_cols).set_index("time")
 
-        # Convert the DataFrame to an xarray Dataset, sort by time, and resample
-        return sdf.to_xarray().sortby("time").resample(time=sample_rate).mean("time")
+        return sdf.sort_index()
 
-    except Exception as e:
+    except DATA_ERRORS as e:
+        logger.debug("Could not read %s data for station %s: %s", yr, station_id, e)
         if display_error:
             print(f"Error extracting data for station {station_id}, year {yr}: {e}")
         return None
 
 
+def _station_links_or_empty(station_id: str) -> Dict[str, str]:
+    """Return the historical links of a station, or no links if the lookup fails."""
+    try:
+        return _historical_links(station_id)
+    except DATA_ERRORS as e:
+        logger.warning("Could not list historical data for station %s: %s", station_id, e)
+        return {}
+
+
+def _fetch_task(
+    task: Tuple[str, int, str],
+    required_variable: Optional[str] = None
+) -> Optional[pd.DataFrame]:
+    """Read one (station_id, year, url) download task; module-level so it can be pickled."""
+    station_id, yr, slink = task
+    return _read_historical_year(yr, station_id=station_id, slink=slink, required_variable=required_variable)
+
+
+def _iter_completed(
+    func: Callable,
+    items: List,
+    sequential: bool = False,
+    backend: Literal["thread", "process"] = "thread",
+    **progress
+) -> Iterator[Tuple[int, Any]]:
+    """
+    Apply func to every item in a thread or process pool, with a progress bar.
+
+    Yields (index, result) pairs. The thread backend yields results as soon as they
+    complete, so the caller can process them while the remaining items run. If
+    sequential is True, items are processed one at a time in the calling thread, which
+    eases debugging. With the "process" backend, func and items must be picklable.
+    """
+    if sequential:
+        yield from enumerate(func(item) for item in tqdm(items, **progress))
+
+    elif backend == "thread":
+        # Downloads are I/O-bound, so the pool is not limited by the CPU count
+        max_workers = max(min(MAX_CONCURRENT_REQUESTS, len(items)), 1)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {executor.submit(func, item): i for i, item in enumerate(items)}
+            for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), **progress):
+                yield futures[future], future.result()
+        finally:
+            # On errors, Ctrl-C or an abandoned loop, drop the queued tasks
+            # instead of running all of them first
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    elif backend == "process":
+        # Parsing holds the GIL, so processes help once downloads are no longer the bottleneck
+        # Forked workers would share the parent's pooled HTTP connections, so each
+        # worker starts with a fresh session instead
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=os.cpu_count(), initializer=get_session.cache_clear
+        )
+        try:
+            results = executor.map(func, items, chunksize=8)
+            yield from enumerate(tqdm(results, total=len(items), **progress))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    else:
+        raise ValueError(f"backend must be 'thread' or 'process', got {backend!r}")
+
+
+def _parallel_map(func: Callable, items: List, **kwargs) -> List:
+    """Apply func to every item like `_iter_completed`, returning results in the order of items."""
+    results = [None] * len(items)
+    for i, result in _iter_completed(func, items, **kwargs):
+        results[i] = result
+    return results
+
+
+def _combine_station_years(
+    station_id: str,
+    yearly: List[Tuple[int, Optional[pd.DataFrame]]],
+    sample_rate: str
+) -> Optional[pd.DataFrame]:
+    """Concatenate and resample the (year, DataFrame) results of one station."""
+    # Report failures once per station; files skipped for a missing variable are empty
+    failed = sum(frame is None for _, frame in yearly)
+    if failed:
+        logger.warning("Could not read %d of %d yearly files for station %s", failed, len(yearly), station_id)
+
+    frames = [
+        frame for _, frame in sorted(yearly, key=lambda pair: pair[0])
+        if frame is not None and not frame.empty
+    ]
+    if not frames:
+        return None
+
+    sdf = pd.concat(frames)
+    sdf = sdf[~sdf.index.duplicated(keep="first")]  # sometimes the records overlap
+
+    # Resample all years of the station at once
+    resampled = sdf.sort_index().resample(sample_rate).mean(numeric_only=True)
+
+    # Keep only the bins spanned by the files read, so that gaps between requested
+    # years do not become empty rows
+    spans = [
+        pd.Series(0, index=[frame.index.min(), frame.index.max()]).resample(sample_rate).size().index
+        for frame in frames
+    ]
+    return resampled[resampled.index.isin(functools.reduce(pd.Index.union, spans))]
+
+
 def get_station_records(
     station_list: List[str],
     years: List[int],
     sample_rate: str = "D",
-    debugging: bool = False
+    debugging: bool = False,
+    backend: Literal["thread", "process"] = "thread",
+    required_variable: Optional[str] = None
 ) -> xr.Dataset:
     """
     Retrieve and process historical records for multiple stations and years.
@@ -150,6 +433,13 @@ def get_station_records(
         Resampling rate (default is daily "D").
     debugging : bool, optional
         If True, processes data sequentially for easier debugging (default is False).
+    backend : {"thread", "process"}, optional
+        Pool used to download and parse the yearly files (default is "thread").
+        Threads suit network-bound downloads; processes parallelize the parsing,
+        which pays off when the files download quickly.
+    required_variable : str, optional
+        Variable each yearly file must contain, e.g. "WTMP". Files without it are
+        skipped after reading their header, without downloading the rest.
 
     Returns
     -------
@@ -157,38 +447,65 @@ def get_station_records(
         Merged dataset containing historical records for all stations and years.
         Includes a 'station_id' dimension.
     """
-    # Determine the number of workers for parallel processing
-    max_workers = max(os.cpu_count() - 1, 1)
-
-    # List to store the results for each station
-    xxsdf = []
-
-    # Iterate through each station with a progress bar
-    for station_id in tqdm(station_list, desc="Fetching stations", unit="station"):
-        # Define a lambda function to process each year for the current station
-        particular_historical_record = lambda yr: extract_historical_year(
-            yr, station_id=station_id, sample_rate=sample_rate
-        )
+    # Look up the historical file links once per station
+    station_links = _parallel_map(
+        _station_links_or_empty, station_list, sequential=debugging,
+        desc="Fetching station listings", unit="station"
+    )
+
+    # Flatten stations and available years into one list of downloads
+    tasks = [
+        (station_id, yr, links[str(int(yr))])
+        for station_id, links in zip(station_list, station_links)
+        for yr in years if str(int(yr)) in links
+    ]
+
+    # Combine the years of each station as soon as its last download completes,
+    # while the downloads of other stations are still running
+    remaining = Counter(station_id for station_id, _, _ in tasks)
+    yearly = defaultdict(list)
+    combined = {}
+    for i, result in _iter_completed(
+        functools.partial(_fetch_task, required_variable=required_variable), tasks,
+        sequential=debugging, backend=backend,
+        desc="Fetching station records", unit="file"
+    ):
+        station_id, yr, _ = tasks[i]
+        yearly[station_id].append((yr, result))
+        remaining[station_id] -= 1
+        if remaining[station_id] == 0:
+            combined[station_id] = _combine_station_years(station_id, yearly.pop(station_id), sample_rate)
+
+    # Keep the order of station_list, leaving out stations without data
+    station_frames = {
+        station_id: combined[station_id]
+        for station_id in station_list if combined.get(station_id) is not None
+    }
+
+    if not station_frames:
+        return xr.Dataset()
+
+    return _stack_stations(station_frames)
+
+
+def _stack_stations(station_frames: Dict[str, pd.DataFrame]) -> xr.Dataset:
+    """
+    Combine time-indexed station DataFrames into one (station_id, time) Dataset.
 
-        # If debugging is enabled, process the data sequentially
-        if debugging:
-            results = []
-            for yr in years:
-                results.append(particular_historical_record(yr))
-        else:
-            # Use ThreadPoolExecutor for parallel processing of years
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                results = list(executor.map(particular_historical_record, years))
-
-        # Filter out None results
-        results = [r for r in results if r is not None]
-
-        # If there are multiple results, concatenate them and handle duplicates
-        if len(results) > 1:
-            xsdf = xr.concat(results, dim="time").sortby("time")
-            xsdf = xsdf.drop_duplicates("time")  # sometimes the records overlap
-            xsdf = xsdf.assign_coords(station_id=station_id).expand_dims("station_id")
-            xxsdf.append(xsdf)
-
-    # Merge the results for all stations into a single xarray Dataset
-    return xr.merge(xxsdf)
+    Every frame is aligned to the union of all times and variables and stacked into a
+    single array, without a MultiIndex unstack or per-station merges. Times and
+    variables missing for a station are NaN.
+    """
+    frames = list(station_frames.values())
+    time = functools.reduce(pd.Index.union, (frame.index for frame in frames))
+    variables = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+
+    # Array of shape (station, time, variable); averages of NDBC observations fit in float32
+    cube = np.stack([
+        frame.reindex(index=time, columns=variables).to_numpy(dtype=np.float32) for frame in frames
+    ])
+
+    return xr.Dataset(
+        {var: (("station_id", "time"), cube[:, :, i]) for i, var in enumerate(variables)},
+        coords={"station_id": list(station_frames), "time": time.rename("time")}
+    )
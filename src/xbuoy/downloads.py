@@ -0,0 +1,216 @@
+"""
+Download helpers and on-disk caching for NDBC requests.
+
+This module stores downloaded NDBC files and API listings under a per-user cache
+directory so that repeated sessions do not re-fetch station tables and historical
+data listings, and provides in-process memoization for the same results.
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# Cached entries older than this (in seconds) are fetched again
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+# Upper bound on simultaneous NDBC requests. Requests are I/O-bound, so this is
+# independent of the CPU count, but kept modest to stay polite to NDBC servers.
+MAX_CONCURRENT_REQUESTS = 32
+
+# Errors raised when NDBC has no usable data for a request. ValueError also covers
+# pandas and pyarrow parsing errors; anything else indicates a bug and propagates.
+DATA_ERRORS = (requests.RequestException, LookupError, ValueError)
+
+# Cache file names: md5 digest of the key plus an optional suffix
+_CACHE_NAME = re.compile(r"^[0-9a-f]{32}(\.[A-Za-z0-9]+)?$")
+
+# In-process caches registered through `memoize`, reset by `clear_cache`
+_memory_caches: List[Callable] = []
+
+
+def get_cache_dir() -> Path:
+    """
+    Return the directory used by xbuoy for on-disk caching.
+
+    The location can be set with the ``XBUOY_CACHE_DIR`` environment variable.
+    Otherwise ``$XDG_CACHE_HOME/xbuoy`` is used, defaulting to ``~/.cache/xbuoy``.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the cache directory (it may not exist yet).
+    """
+    cache_dir = os.environ.get("XBUOY_CACHE_DIR")
+    if not cache_dir:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        cache_dir = os.path.join(base, "xbuoy")
+    return Path(cache_dir)
+
+
+def _cache_path(key: str, suffix: str = "") -> Path:
+    """Map a cache key (e.g. a URL) to a file name inside the cache directory."""
+    digest = hashlib.md5(key.encode("utf-8")).hexdigest()
+    return get_cache_dir() / f"{digest}{suffix}"
+
+
+def _is_fresh(path: Path, max_age: float) -> bool:
+    """Check whether a cached file exists and is younger than max_age seconds."""
+    return path.exists() and (time.time() - path.stat().st_mtime) < max_age
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write bytes through a temporary file so readers never see a partial file."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        # An unwritable cache directory only disables caching
+        pass
+
+
+def cached_download(url: str, max_age: float = DEFAULT_MAX_AGE) -> bytes:
+    """
+    Download a file, reusing a copy from the on-disk cache when it is recent enough.
+
+    Parameters
+    ----------
+    url : str
+        URL of the file to download. The md5 hash of the URL is used as cache key.
+    max_age : float, optional
+        Maximum age in seconds of a cached copy before it is downloaded again
+        (default: one day).
+
+    Returns
+    -------
+    bytes
+        Contents of the file.
+
+    Raises
+    ------
+    requests.RequestException
+        If the download fails or times out; nothing is cached then.
+    """
+    path = _cache_path(url, suffix=os.path.splitext(url)[1])
+    if _is_fresh(path, max_age):
+        return path.read_bytes()
+
+    if url.startswith("file:"):
+        # Local files (as used by the tests) cannot stall, so no session is needed
+        with urllib.request.urlopen(url) as response:
+            data = response.read()
+    else:
+        response = get_session().get(url, timeout=60)
+        response.raise_for_status()
+        data = response.content
+    _write_atomic(path, data)
+    return data
+
+
+def cached_call(
+    key: str,
+    func: Callable[[], Any],
+    max_age: float = DEFAULT_MAX_AGE,
+    cache_if: Optional[Callable[[Any], bool]] = None
+) -> Any:
+    """
+    Return the result of ``func()``, pickled on disk under the given key.
+
+    Parameters
+    ----------
+    key : str
+        Unique key identifying the result, e.g. "available_historical:tplm2".
+    func : callable
+        Function without arguments computing the result on a cache miss.
+        Exceptions raised by func are propagated and nothing is cached.
+    max_age : float, optional
+        Maximum age in seconds of a cached result (default: one day).
+    cache_if : callable, optional
+        Predicate called with the computed result; if it returns False, the result
+        is returned without being written to disk. By default every result is cached.
+
+    Returns
+    -------
+    object
+        The cached or freshly computed result.
+    """
+    path = _cache_path(key, suffix=".pkl")
+    if _is_fresh(path, max_age):
+        try:
+            return pickle.loads(path.read_bytes())
+        except Exception:
+            # Corrupt or incompatible cache entries are simply recomputed
+            pass
+
+    result = func()
+    if cache_if is not None and not cache_if(result):
+        return result
+    _write_atomic(path, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+    return result
+
+
+def memoize(maxsize: int = 128) -> Callable[[Callable], Callable]:
+    """
+    Cache a function in memory with ``functools.lru_cache``.
+
+    Functions decorated this way are also reset by `clear_cache`.
+    """
+    def decorator(func: Callable) -> Callable:
+        cached_func = functools.lru_cache(maxsize=maxsize)(func)
+        _memory_caches.append(cached_func)
+        return cached_func
+
+    return decorator
+
+
+@memoize(maxsize=1)
+def get_session() -> requests.Session:
+    """
+    Return the HTTP session shared by all NDBC downloads.
+
+    Transient server errors (HTTP 500, 502, 503, 504) and dropped connections are
+    retried up to three times with exponential backoff, and the connection pool is
+    sized for `MAX_CONCURRENT_REQUESTS` simultaneous downloads.
+    """
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+    adapter = HTTPAdapter(max_retries=retries, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def clear_cache() -> None:
+    """
+    Remove all cached NDBC downloads, both on disk and in memory.
+
+    Examples
+    --------
+    Force the station table to be downloaded again:
+    >>> xbuoy.clear_cache()
+    >>> stations = xbuoy.list_stations()
+    """
+    for cached_func in _memory_caches:
+        cached_func.cache_clear()
+
+    cache_dir = get_cache_dir()
+    if not cache_dir.is_dir():
+        return
+
+    # Only remove files named after a cache key, never unrelated user files
+    for path in cache_dir.iterdir():
+        if path.is_file() and _CACHE_NAME.match(path.name):
+            path.unlink(missing_ok=True)
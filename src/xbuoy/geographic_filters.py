@@ -5,6 +5,7 @@ This module provides functions to filter buoy station datasets based on
 geographic criteria such as bounding boxes and regions.
 """
 
+import numpy as np
 import xarray as xr
 
 
@@ -44,9 +45,18 @@ def box_filter_buoys(
     Filter buoys along the US East Coast:
     >>> east_coast = box_filter_buoys(ds, lon1=-80, lon2=-65, lat1=25, lat2=45)
     """
-    # Create a boolean mask for the longitude and latitude conditions
-    longitude_box = (ds.longitude >= lon1) * (ds.longitude <= lon2)
-    latitude_box = (ds.latitude >= lat1) * (ds.latitude <= lat2)
-
-    # Apply the mask to the dataset and drop stations outside the specified box
-    return ds.where(longitude_box * latitude_box, drop=True)
+    # Gridded or time-varying positions cannot be reduced to a list of stations
+    if ds.longitude.dims != ("station_id",) or ds.latitude.dims != ("station_id",):
+        in_box = (
+            (ds.longitude >= lon1) & (ds.longitude <= lon2)
+            & (ds.latitude >= lat1) & (ds.latitude <= lat2)
+        )
+        return ds.where(in_box.compute(), drop=True)
+
+    # Create a boolean mask over station_id for the longitude and latitude conditions
+    lon = ds.longitude.values
+    lat = ds.latitude.values
+    in_box = (lon >= lon1) & (lon <= lon2) & (lat >= lat1) & (lat <= lat2)
+
+    # Select the stations inside the box without NaN-filling the other variables
+    return ds.isel(station_id=np.flatnonzero(in_box))
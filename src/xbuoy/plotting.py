@@ -7,11 +7,52 @@ locations and their associated data variables.
 
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
+import numpy as np
+import pandas as pd
 import xarray as xr
-from typing import Tuple
+from typing import Optional, Tuple
 
+# Above this many points, markers are aggregated into an image if datashader is installed
+DENSITY_THRESHOLD = 10_000
 
-def plot_stations(ds: xr.Dataset, variable: str = None) -> Tuple[plt.Figure, plt.Axes]:
+
+def _plot_density(ax: plt.Axes, lons: np.ndarray, lats: np.ndarray, values: Optional[np.ndarray] = None):
+    """
+    Draw points as an aggregated image with datashader instead of individual markers.
+
+    Each pixel shows the mean of values for the points falling in it, or the number
+    of points if values is None. Raises ImportError if datashader is not installed.
+    """
+    import datashader as dsh
+
+    points = pd.DataFrame({"x": lons, "y": lats})
+    points["v"] = 1.0 if values is None else values
+    points = points.dropna(subset=["x", "y"])
+
+    x_range = (points["x"].min(), points["x"].max())
+    y_range = (points["y"].min(), points["y"].max())
+    canvas = dsh.Canvas(plot_width=800, plot_height=600, x_range=x_range, y_range=y_range)
+    reduction = dsh.count() if values is None else dsh.mean("v")
+    image = canvas.points(points, "x", "y", reduction).to_numpy().astype(float)
+
+    # Leave pixels without points transparent
+    if values is None:
+        image[image == 0] = np.nan
+
+    return ax.imshow(
+        np.ma.masked_invalid(image),
+        origin="lower",
+        extent=[*x_range, *y_range],
+        transform=ccrs.PlateCarree()
+    )
+
+
+def plot_stations(
+    ds: xr.Dataset,
+    variable: str = None,
+    rasterized: bool = True,
+    density_threshold: Optional[int] = DENSITY_THRESHOLD
+) -> Tuple[plt.Figure, plt.Axes]:
     """
     Plot buoy station locations on a map, optionally colored by a data variable.
 
@@ -22,6 +63,14 @@ def plot_stations(ds: xr.Dataset, variable: str = None) -> Tuple[plt.Figure, plt
     variable : str, optional
         Name of a data variable to use for coloring the station points.
         If None, plots simple station locations. Common variables: 'WTMP', 'wtemp_coverage'.
+    rasterized : bool, optional
+        Whether to rasterize the station markers when saving to vector formats
+        such as PDF or SVG (default: True). Coastlines, gridlines and labels stay
+        vectorized; the marker resolution follows the ``dpi`` given to ``fig.savefig``.
+    density_threshold : int, optional
+        When the dataset has more points than this and ``datashader`` is installed,
+        points are aggregated into an image (mean of the variable, or point counts)
+        instead of drawn as markers (default: 10,000). Set to None to always draw markers.
 
     Returns
     -------
@@ -39,16 +88,34 @@ def plot_stations(ds: xr.Dataset, variable: str = None) -> Tuple[plt.Figure, plt
     # Create a figure and axis with a Plate Carree projection
     fig, ax = plt.subplots(subplot_kw={'projection': ccrs.PlateCarree()})
 
-    if variable is None:
-        # Plot each station's location as a simple scatter point
-        for station in ds.station_id:
-            station_coords = ds.sel(station_id=station)
-            ax.scatter(station_coords.longitude, station_coords.latitude,
-                      transform=ccrs.PlateCarree())
-    else:
-        # Plot stations colored by the specified variable
-        cm = ax.scatter(ds.longitude, ds.latitude, c=ds[variable].values,
-                       transform=ccrs.PlateCarree())
+    # Load only the plotted variables, computing dask-backed data once
+    names = ["longitude", "latitude"] + ([] if variable is None else [variable])
+    ds = ds[names].compute()
+
+    # Station coordinates are 1-D over station_id, so extract them once
+    lons = np.asarray(ds.longitude.data)
+    lats = np.asarray(ds.latitude.data)
+
+    values = None if variable is None else np.asarray(ds[variable].data)
+
+    # Aggregate very large point sets into an image, falling back to markers
+    cm = None
+    if density_threshold is not None and lons.size > density_threshold:
+        try:
+            cm = _plot_density(ax, lons, lats, values)
+        except ImportError:
+            pass
+
+    if cm is None:
+        if variable is None:
+            # Plot all station locations with a single scatter call
+            cm = ax.scatter(lons, lats, transform=ccrs.PlateCarree(), rasterized=rasterized)
+        else:
+            # Plot stations colored by the specified variable
+            cm = ax.scatter(lons, lats, c=values,
+                           transform=ccrs.PlateCarree(), rasterized=rasterized)
+
+    if variable is not None:
         # Add a colorbar to indicate the range of the variable
         fig.colorbar(cm, label=variable)
 
@@ -5,16 +5,23 @@ This module provides functions to fetch and process metadata for NOAA NDBC buoy
 including station locations, available time ranges, and other station information.
 """
 
+import io
+import logging
 import warnings
 import pandas as pd
 import numpy as np
+import requests
 import concurrent.futures
-from typing import Union, Dict, Tuple, List
+from typing import Union, Dict, Tuple, List, Optional
 from tqdm import tqdm
 
+from .downloads import DATA_ERRORS, MAX_CONCURRENT_REQUESTS, cached_call, cached_download, memoize
+
 # Suppress deprecation warnings from ndbc_api
 warnings.filterwarnings('ignore', category=DeprecationWarning, module='ndbc_api')
 
+logger = logging.getLogger(__name__)
+
 
 def _get_api():
     """Create the NDBC client only when metadata functions are invoked."""
@@ -23,53 +30,114 @@ def _get_api():
     return NdbcApi()
 
 
-def _latitude_sign(direction: str) -> int:
-    """Convert latitude direction to sign multiplier."""
-    return 1 if direction == "N" else -1
+# NDBC table listing every station with its owner, type, location and notes
+STATION_TABLE_URL = "https://www.ndbc.noaa.gov/data/stations/station_table.txt"
 
 
-def _longitude_sign(direction: str) -> int:
-    """Convert longitude direction to sign multiplier."""
-    return 1 if direction == "E" else -1
+def _parse_location(location: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert NDBC LOCATION strings (e.g. "17.869 N 66.532 W (...)") to signed floats.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        Latitudes and longitudes in degrees; NaN where the string cannot be parsed.
+    """
+    parts = location.str.extract(r"^\s*([\d.]+)\s*([NS])\s+([\d.]+)\s*([EW])")
+    latitude = parts[0].astype(float).to_numpy() * np.where(parts[1] == "S", -1, 1)
+    longitude = parts[2].astype(float).to_numpy() * np.where(parts[3] == "W", -1, 1)
+    return latitude, longitude
 
 
-def _get_latitude(number: str, direction: str) -> float:
-    """Convert latitude value and direction to signed float."""
-    return float(number) * _latitude_sign(direction)
+# Title of the standard meteorological data in NDBC historical data listings
+_STDMET_TITLE = "Standard meteorological data"
+
+
+@memoize(maxsize=4096)
+def _available_historical(station_id: str) -> Dict[str, str]:
+    """
+    Fetch the standard meteorological data links of a station.
+
+    Links are keyed by year (e.g. "2020") or, for the current year, by month
+    (e.g. "Jan 2026"). Results are cached in memory and on disk for a day; treat
+    them as read-only. Raises LookupError if NDBC has no listing for the station,
+    and requests.RequestException if the station page could not be fetched.
+    """
+    from ndbc_api.exceptions import NdbcException
+
+    def fetch():
+        # The plain dict form avoids building a DataFrame of every measurement type
+        # ndbc_api's HTML scraper can also fail with e.g. AttributeError on station
+        # pages without a historical data section, so treat any failure as no listing
+        try:
+            listing = _get_api().available_historical(station_id=station_id, as_df=False)
+        except (NdbcException, AttributeError, TypeError, IndexError, KeyError) as e:
+            raise LookupError(f"No historical data listing for station {station_id}") from e
+        if not listing:
+            # ndbc_api returns an empty listing when the station page request fails
+            raise requests.HTTPError(f"Could not fetch the station page of {station_id}")
 
+        # Standard meteorological data is normally listed first; use the first entry otherwise
+        return listing.get(_STDMET_TITLE, next(iter(listing.values())))
 
-def _get_longitude(number: str, direction: str) -> float:
-    """Convert longitude value and direction to signed float."""
-    return float(number) * _longitude_sign(direction)
+    return cached_call(f"historical_links:{station_id}", fetch)
 
 
-def get_historical_bounds(station_id: str) -> Dict[str, Tuple[str, str]]:
+def get_historical_bounds(station_id: Union[str, List[str]]) -> Dict[str, Tuple[str, str]]:
     """
-    Retrieve the first and last available historical data years for a station.
+    Retrieve the first and last available historical data years for one or more stations.
 
     Parameters
     ----------
-    station_id : str
-        ID of the station.
+    station_id : str or list of str
+        ID of the station, or a list of IDs whose listings are fetched in parallel.
 
     Returns
     -------
     dict
-        Dictionary with station_id as the key and a tuple (min_year, max_year) as the value.
-        If data retrieval fails, returns (np.nan, np.nan).
+        Dictionary with station_id as the key and a tuple (min_year, max_year) as the value,
+        in the order of the given IDs. If data retrieval fails, returns (np.nan, np.nan).
+
+    Examples
+    --------
+    >>> get_historical_bounds(["41001", "tplm2"])
     """
-    try:
-        api = _get_api()
-        # Fetch available historical data as a DataFrame
-        historical_df = api.available_historical(station_id=station_id, as_df=True)
-        # Retain only the first row and drop columns with NA values
-        historical_df = historical_df.iloc[[0], :].dropna(axis=1)
-        # Extract years from the column names (excluding columns with spaces)
-        available_historical = np.array([col for col in historical_df.columns if " " not in col])
+    if not isinstance(station_id, str):
+        station_ids = list(station_id)
+        bounds = {sid: b for d in fetch_station_historical_bounds(station_ids) for sid, b in d.items()}
+        return {sid: bounds[sid] for sid in station_ids}
+
+    return _lookup_bounds(station_id)[0]
+
+
+def _historical_bounds(station_id: str) -> Tuple[str, str]:
+    """
+    Return the first and last whole years in the historical listing of a station.
 
-        return {station_id: (min(available_historical), max(available_historical))}
-    except Exception:
-        return {station_id: (np.nan, np.nan)}
+    Raises LookupError or ValueError if the station has no historical years, and
+    requests.RequestException if its listing could not be fetched.
+    """
+    # Keep whole years (monthly files are named e.g. "Jan 2026")
+    years = [year for year in _available_historical(station_id) if year.isdigit()]
+    return min(years), max(years)
+
+
+def _lookup_bounds(station_id: str) -> Tuple[Dict[str, Tuple[str, str]], bool]:
+    """
+    Look up the bounds of one station like `get_historical_bounds`.
+
+    Also returns whether the lookup failed because NDBC could not be reached, as
+    opposed to the station having no historical data.
+    """
+    try:
+        return {station_id: _historical_bounds(station_id)}, False
+    except requests.RequestException as e:
+        logger.debug("Could not fetch the historical listing of station %s: %s", station_id, e)
+        return {station_id: (np.nan, np.nan)}, True
+    except DATA_ERRORS as e:
+        # Many stations have no historical data, so this is not worth a warning
+        logger.debug("No historical bounds for station %s: %s", station_id, e)
+        return {station_id: (np.nan, np.nan)}, False
 
 
 def fetch_station_historical_bounds(station_ids: List[str]) -> List[Dict[str, Tuple[str, str]]]:
@@ -87,10 +155,18 @@ def fetch_station_historical_bounds(station_ids: List[str]) -> List[Dict[str, Tu
         A list of dictionaries, each containing the station ID as the key and
         a tuple (min_year, max_year) as the value.
     """
+    return [bounds for bounds, _ in _fetch_bounds(station_ids)]
+
+
+def _fetch_bounds(station_ids: List[str]) -> List[Tuple[Dict[str, Tuple[str, str]], bool]]:
+    """Run `_lookup_bounds` for every station in a thread pool, in completion order."""
+    # Requests are I/O-bound, so use a fixed-size pool rather than one sized by CPU count
+    max_workers = max(min(MAX_CONCURRENT_REQUESTS, len(station_ids)), 1)
+
     # Use ThreadPoolExecutor for parallel processing with progress bar
-    with concurrent.futures.ThreadPoolExecutor() as executor:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Submit all tasks
-        futures = {executor.submit(get_historical_bounds, sid): sid for sid in station_ids}
+        futures = {executor.submit(_lookup_bounds, sid): sid for sid in station_ids}
 
         # Collect results with progress bar
         observation_bounds = []
@@ -109,56 +185,110 @@ def get_buoy_metadata() -> pd.DataFrame:
     """
     Fetch metadata for all NDBC buoy stations.
 
+    The result is cached for the rest of the session, and the underlying NDBC
+    downloads are cached on disk for a day (see `xbuoy.clear_cache`).
+
     Returns
     -------
     pd.DataFrame
         DataFrame containing station metadata including location, observation bounds,
         and other station information. Index is station_id.
     """
+    return _load_buoy_metadata().copy()
+
+
+@memoize(maxsize=1)
+def _load_buoy_metadata() -> pd.DataFrame:
+    """
+    Build the buoy metadata table; cached so repeated calls are free.
+
+    The finished table is also pickled in the cache directory, so new sessions
+    skip parsing the station table and the per-station listings. Tables missing
+    stations whose listing could not be fetched are not written to disk.
+    """
+    failed = []
+
+    def build():
+        stations = _get_station_table()
+
+        # Fetch observation bounds for all stations (the expensive part)
+        observation_bounds, n_failed = _get_station_bounds(stations.index.tolist())
+        if n_failed:
+            logger.warning(
+                "Could not fetch the historical listing of %d of %d stations; "
+                "call xbuoy.clear_cache() to retry", n_failed, len(stations)
+            )
+            failed.append(n_failed)
+
+        # Keep only stations with valid bounds and attach min_year/max_year
+        return stations.merge(observation_bounds, left_index=True, right_index=True)
+
+    return cached_call("buoy_metadata", build, cache_if=lambda table: not failed)
+
+
+@memoize(maxsize=2)
+def _get_station_table(columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """
+    Load the NDBC station table, restricted to buoys and indexed by station_id.
+
+    This only needs a single (cached) download, unlike the observation bounds.
+    If columns is given (e.g. ("LOCATION",)), only those columns are parsed.
+    """
+    # The station ID and type are always needed to select the buoys
+    keep = None if columns is None else {"STATION_ID", "TTYPE", *columns}
+
     # Load the station data, skip the first row, and replace NaN with a space
     stations = pd.read_csv(
-        "https://www.ndbc.noaa.gov/data/stations/station_table.txt",
+        io.BytesIO(cached_download(STATION_TABLE_URL)),
         sep="|",
-        na_values=""
+        na_values="",
+        # Column names are padded and the first one is commented out ("# STATION_ID ")
+        usecols=None if keep is None else (lambda name: name.strip(" #") in keep)
     ).iloc[1:].fillna(" ")
 
-    # Rename the first column to 'station_id'
+    # Strip padding from the column names and rename the first column to 'station_id'
+    stations = stations.rename(columns=lambda x: x.strip())
     stations.rename(columns={stations.columns[0]: "station_id"}, inplace=True)
 
     # Filter stations to only include buoys
-    stations = stations[stations.iloc[:, 2].str.lower().str.contains("buoy")]
-
-    # Extract station IDs and convert them to strings
-    station_id = stations.iloc[:, 0].astype(str).tolist()
+    stations = stations[stations["TTYPE"].str.lower().str.contains("buoy")]
 
-    # Fetch observation bounds for all stations
-    observation_bounds = fetch_station_historical_bounds(station_id)
+    # Index by station ID as strings
+    return stations.set_index(stations["station_id"].astype(str)).drop(columns="station_id")
 
-    # Convert the list of dicts into a single dict
-    observation_bounds_dict = {k: v for d in observation_bounds for k, v in d.items()}
 
-    # Create a DataFrame, filter out stations with NaN bounds
-    observation_bounds_df = pd.DataFrame(observation_bounds_dict).dropna(axis=1)
+def _get_station_bounds(station_ids: List[str]) -> Tuple[pd.DataFrame, int]:
+    """
+    Fetch the first and last historical years of each station.
 
-    # Filter the stations DataFrame to include only stations with valid bounds
-    stations_filt = stations[stations['station_id'].isin(observation_bounds_df.columns)]
+    Returns a DataFrame indexed by station_id with min_year and max_year columns,
+    in which stations without historical data are left out, and the number of
+    stations whose listing could not be fetched.
+    """
+    observation_bounds = _fetch_bounds(station_ids)
 
-    # Reshape the bounds DataFrame and merge it with the filtered stations DataFrame
-    observation_bounds_filt = (
-        observation_bounds_df.T
-        .reset_index()
-        .rename(columns={"index": "station_id", 0: "min_year", 1: "max_year"})
-    )
+    # Build the table in one go, leaving out stations with NaN bounds
+    records = [
+        (station_id, min_year, max_year)
+        for bounds, _ in observation_bounds
+        for station_id, (min_year, max_year) in bounds.items()
+        if pd.notna(min_year)
+    ]
+    n_failed = sum(failed for _, failed in observation_bounds)
+    table = pd.DataFrame(records, columns=["station_id", "min_year", "max_year"]).set_index("station_id")
+    return table, n_failed
 
-    # Set station_id as the index for merging
-    stations_filt.set_index("station_id", inplace=True)
-    observation_bounds_filt.set_index("station_id", inplace=True)
 
-    # Merge the filtered stations with their corresponding observation bounds
-    stations_filt = stations_filt.merge(observation_bounds_filt, left_index=True, right_index=True)
-    stations_filt = stations_filt.rename(columns=lambda x: x.strip())
+def _get_station_locations() -> 'xr.Dataset':
+    """
+    Get latitude and longitude of every buoy from the station table alone.
 
-    return stations_filt
+    Unlike `get_buoy_stations`, this skips the per-station historical bounds lookup.
+    """
+    stations = _get_station_table(columns=("LOCATION",))
+    latitude, longitude = _parse_location(stations["LOCATION"])
+    locations = pd.DataFrame({"latitude": latitude, "longitude": longitude}, index=stations.index)
+    return locations.to_xarray()
 
 
 def get_buoy_stations(data_format: str = "xarray") -> Union[pd.DataFrame, 'xr.Dataset']:
@@ -179,14 +309,9 @@ def get_buoy_stations(data_format: str = "xarray") -> Union[pd.DataFrame, 'xr.Da
     bmetadata = get_buoy_metadata()
 
     # Create simplified station dataset
-    buoy_stations = bmetadata[["min_year", "max_year"]].astype(float)
+    buoy_stations = bmetadata[["min_year", "max_year"]].astype(np.int16)
     buoy_stations['notes'] = bmetadata['NOTE']
-    buoy_stations["latitude"] = bmetadata["LOCATION"].apply(
-        lambda x: _get_latitude(x.split()[0], x.split()[1])
-    )
-    buoy_stations["longitude"] = bmetadata["LOCATION"].apply(
-        lambda x: _get_longitude(x.split()[2], x.split()[3])
-    )
+    buoy_stations["latitude"], buoy_stations["longitude"] = _parse_location(bmetadata["LOCATION"])
     buoy_stations.index = buoy_stations.index.astype(str)
 
     if data_format == "xarray":
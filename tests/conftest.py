@@ -1,9 +1,78 @@
 from pathlib import Path
 import sys
 
+import numpy as np
+import pytest
+import xarray as xr
+
 
 ROOT = Path(__file__).resolve().parents[1]
 SRC = ROOT / "src"
 
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
+
+
+@pytest.fixture(scope="session")
+def buoy_metadata():
+    """Buoy metadata loaded once per test session, so later calls hit the in-memory cache."""
+    from xbuoy import station_metadata
+
+    return station_metadata.get_buoy_metadata()
+
+
+@pytest.fixture(scope="session")
+def all_stations():
+    """All buoy stations as an xarray Dataset, loaded once per test session."""
+    import xbuoy
+
+    return xbuoy.list_stations()
+
+
+@pytest.fixture(scope="session")
+def all_stations_pandas():
+    """All buoy stations as a pandas DataFrame, loaded once per test session."""
+    import xbuoy
+
+    return xbuoy.list_stations(data_format="pandas")
+
+
+# Small synthetic datasets shared by the data processing tests. They are built once
+# per module, so tests must not modify them in place (pass a .copy() instead).
+
+# Daily time axis of the synthetic datasets, as plain datetime64 values
+TIME_10 = np.datetime64("2020-01-01", "ns") + np.arange(10, dtype="timedelta64[D]")
+
+
+@pytest.fixture(scope="module")
+def wtmp_ds():
+    """Water temperature at stations A, B and C; station A misses its first 5 of 10 days."""
+    rng = np.random.default_rng(0)
+    wtmp = rng.random((3, 10))
+    wtmp[0, :5] = np.nan
+    return xr.Dataset(
+        {"WTMP": (["station_id", "time"], wtmp)},
+        coords={"station_id": ["A", "B", "C"], "time": TIME_10}
+    )
+
+
+@pytest.fixture(scope="module")
+def wspd_ds():
+    """Complete wind speed records of 10 days at stations A and B."""
+    rng = np.random.default_rng(1)
+    return xr.Dataset(
+        {"WSPD": (["station_id", "time"], rng.random((2, 10)))},
+        coords={"station_id": ["A", "B"], "time": TIME_10}
+    )
+
+
+@pytest.fixture(scope="module")
+def latlon_reference():
+    """Reference locations of stations A and B."""
+    return xr.Dataset(
+        {
+            "latitude": (["station_id"], [40.0, 42.0]),
+            "longitude": (["station_id"], [-70.0, -72.0]),
+        },
+        coords={"station_id": ["A", "B"]}
+    )
@@ -8,7 +8,10 @@ import pandas as pd
 import numpy as np
 
 import xbuoy
-from xbuoy import data_processing, geographic_filters
+from xbuoy import data_processing, data_retrieval, downloads, geographic_filters, station_metadata
+
+# Two-day time axis of the synthetic datasets, as plain datetime64 values
+TIME_2 = np.datetime64("2020-01-01", "ns") + np.arange(2, dtype="timedelta64[D]")
 
 
 class TestPackageStructure:
@@ -21,75 +24,215 @@ class TestPackageStructure:
 
     def test_core_functions_available(self):
         """Test that core API functions are available at package level."""
-        assert hasattr(xbuoy, "list_stations")
-        assert hasattr(xbuoy, "fetch_data")
-        assert hasattr(xbuoy, "filter_by_region")
-        assert hasattr(xbuoy, "plot_stations")
+        core_names = {"list_stations", "fetch_data", "filter_by_region", "plot_stations"}
+        assert core_names <= set(dir(xbuoy))
 
     def test_advanced_functions_available(self):
         """Test that advanced functions are still available."""
-        assert hasattr(xbuoy, "get_buoy_metadata")
-        assert hasattr(xbuoy, "get_buoy_stations")
-        assert hasattr(xbuoy, "box_filter_buoys")
-        assert hasattr(xbuoy, "compute_data_coverage")
+        advanced = {"get_buoy_metadata", "get_buoy_stations", "box_filter_buoys", "compute_data_coverage"}
+        assert advanced <= set(dir(xbuoy))
 
 
 class TestDataProcessing:
     """Test data processing functions without network access."""
 
-    def test_add_variable_coverage(self):
+    def test_add_variable_coverage(self, wtmp_ds):
         """Test computing data coverage for a variable."""
-        # Create a simple test dataset
-        ds = xr.Dataset({
-            "WTMP": (["station_id", "time"], np.random.rand(3, 10)),
-            "station_id": ["A", "B", "C"],
-            "time": pd.date_range("2020-01-01", periods=10)
-        })
-
-        # Add some NaN values
-        ds["WTMP"].values[0, 0:5] = np.nan  # 50% coverage for station A
-
-        result = data_processing.add_variable_coverage(ds, varname="WTMP")
+        result = data_processing.add_variable_coverage(wtmp_ds.copy(), varname="WTMP")
 
         assert "WTMP_coverage" in result.data_vars
-        assert result["WTMP_coverage"].sel(station_id="A").values == 50.0
-        assert result["WTMP_coverage"].sel(station_id="B").values == 100.0
+        assert result["WTMP_coverage"].dims == ("station_id",)
+        # All stations at once, in station order
+        np.testing.assert_array_equal(result["WTMP_coverage"].values, [50.0, 100.0, 100.0])
+        assert result["WTMP_coverage"].dtype == np.float32
 
-    def test_compute_data_coverage(self):
+    def test_compute_data_coverage(self, wspd_ds):
         """Test the compute_data_coverage function."""
-        # Create a simple test dataset
-        ds = xr.Dataset({
-            "WSPD": (["station_id", "time"], np.random.rand(2, 10)),
-            "station_id": ["A", "B"],
-            "time": pd.date_range("2020-01-01", periods=10)
-        })
-
-        result = data_processing.compute_data_coverage(ds, variable="WSPD")
+        result = data_processing.compute_data_coverage(wspd_ds.copy(), variable="WSPD")
 
         assert "WSPD_coverage" in result.data_vars
-        assert (result["WSPD_coverage"] == 100.0).all()
+        np.testing.assert_array_equal(result["WSPD_coverage"].values, np.full(2, 100.0))
 
-    def test_add_latitude_longitude(self):
+    def test_add_latitude_longitude(self, wspd_ds, latlon_reference):
         """Test adding lat/lon coordinates from reference dataset."""
-        # Create test datasets
-        data = xr.Dataset({
-            "WTMP": (["station_id", "time"], np.random.rand(2, 5)),
-            "station_id": ["A", "B"],
-            "time": pd.date_range("2020-01-01", periods=5)
-        })
-
-        reference = xr.Dataset({
-            "latitude": (["station_id"], [40.0, 42.0]),
-            "longitude": (["station_id"], [-70.0, -72.0]),
-            "station_id": ["A", "B"]
-        })
-
-        result = data_processing.add_latitude_longitude(data, reference)
+        result = data_processing.add_latitude_longitude(wspd_ds, latlon_reference)
 
         assert "latitude" in result.data_vars
         assert "longitude" in result.data_vars
-        assert result["latitude"].sel(station_id="A").values == 40.0
-        assert result["longitude"].sel(station_id="B").values == -72.0
+        assert list(result.station_id.values) == ["A", "B"]
+        np.testing.assert_array_equal(result["latitude"].values, [40.0, 42.0])
+        np.testing.assert_array_equal(result["longitude"].values, [-70.0, -72.0])
+
+    def test_add_latitude_longitude_unknown_station(self, wspd_ds, latlon_reference):
+        """Test that stations missing from the reference get NaN coordinates."""
+        data = wspd_ds.assign_coords(station_id=["A", "Z"])
+
+        result = data_processing.add_latitude_longitude(data, latlon_reference)
+
+        assert result["latitude"].values[0] == 40.0
+        assert np.isnan(result["longitude"].values[1])
+
+
+# Excerpt of the NDBC station table, with one non-buoy station
+STATION_TABLE_TEXT = """\
+# STATION_ID | OWNER | TTYPE | HULL | NAME | PAYLOAD | LOCATION | TIMEZONE | FORECAST | NOTE
+#            |       |       |      |      |         |          |          |          |
+0y2w3|CG|Fixed|  |Sturgeon Bay CG Station, WI|  |44.794 N 87.313 W (44&#176;47'39" N 87&#176;18'48" W)| C| |
+41001|NDBC|3-meter discus buoy|3D34|EAST HATTERAS|DDWM|34.724 N 72.317 W (34&#176;43'26" N 72&#176;19'1" W)|E|FZNT25|
+51001|NDBC|3-meter foam buoy|3F17|NORTHWESTERN HAWAII ONE|SCOOP|24.453 N 162.008 W (24&#176;27'11" N 162&#176;0'29" W)|H| |
+"""
+
+
+@pytest.fixture
+def station_table(tmp_path, monkeypatch):
+    """Serve the station table excerpt from a local file with an empty cache."""
+    table = tmp_path / "station_table.txt"
+    table.write_text(STATION_TABLE_TEXT)
+    monkeypatch.setattr(station_metadata, "STATION_TABLE_URL", table.as_uri())
+    monkeypatch.setenv("XBUOY_CACHE_DIR", str(tmp_path / "cache"))
+    xbuoy.clear_cache()
+    yield table
+    xbuoy.clear_cache()
+
+
+class TestStationMetadata:
+    """Test station metadata parsing without network access."""
+
+    def test_get_station_table_columns(self, station_table):
+        """Test that reading a subset of columns selects the same buoys."""
+        full = station_metadata._get_station_table()
+        subset = station_metadata._get_station_table(columns=("LOCATION",))
+
+        assert list(subset.columns) == ["TTYPE", "LOCATION"]
+        pd.testing.assert_frame_equal(subset, full[["TTYPE", "LOCATION"]])
+
+    def test_get_station_locations(self, station_table):
+        """Test reading buoy locations from the station table only."""
+        locations = station_metadata._get_station_locations()
+
+        assert list(locations.station_id.values) == ["41001", "51001"]
+        assert locations["latitude"].sel(station_id="41001").values == 34.724
+        assert locations["longitude"].sel(station_id="51001").values == -162.008
+
+    def test_get_buoy_stations(self, station_table, monkeypatch):
+        """Test the station summary with fake historical bounds."""
+        def fake_bounds(station_id):
+            if station_id == "51001":
+                raise LookupError(station_id)
+            return "1976", "2024"
+
+        monkeypatch.setattr(station_metadata, "_historical_bounds", fake_bounds)
+
+        stations = station_metadata.get_buoy_stations()
+
+        # Stations without historical data are left out
+        assert list(stations.station_id.values) == ["41001"]
+        assert stations["min_year"].dtype == np.int16
+        assert stations["max_year"].values[0] == 2024
+        assert stations["latitude"].values[0] == 34.724
+
+    def test_buoy_metadata_cached_on_disk(self, station_table, monkeypatch):
+        """Test that a new session reads the finished metadata table from disk."""
+        monkeypatch.setattr(station_metadata, "_historical_bounds", lambda station_id: ("1976", "2024"))
+        metadata = station_metadata.get_buoy_metadata()
+
+        # Simulate a new session: empty in-memory caches, unreachable NDBC
+        for cached_func in downloads._memory_caches:
+            cached_func.cache_clear()
+        monkeypatch.setattr(station_metadata, "_get_station_table", None)
+        monkeypatch.setattr(station_metadata, "_fetch_bounds", None)
+
+        pd.testing.assert_frame_equal(station_metadata.get_buoy_metadata(), metadata)
+
+    def test_buoy_metadata_not_cached_during_outage(self, station_table, monkeypatch):
+        """Test that a table missing unreachable stations is not persisted."""
+        import requests
+
+        class DownApi:
+            def available_historical(self, station_id, as_df):
+                raise requests.ConnectionError("NDBC is down")
+
+        class FakeApi:
+            def available_historical(self, station_id, as_df):
+                # What ndbc_api raises on a page without a historical data section
+                if station_id == "51001":
+                    raise AttributeError("'NoneType' object has no attribute 'find_next_siblings'")
+                return {"Standard meteorological data": {"1976": "url", "2024": "url"}}
+
+        monkeypatch.setattr(station_metadata, "_get_api", DownApi)
+        assert len(station_metadata.get_buoy_metadata()) == 0
+
+        # A new session after NDBC recovers fetches the listings again
+        for cached_func in downloads._memory_caches:
+            cached_func.cache_clear()
+        monkeypatch.setattr(station_metadata, "_get_api", FakeApi)
+        assert list(station_metadata.get_buoy_metadata().index) == ["41001"]
+
+        # Stations without historical data do not prevent the table from being persisted
+        for cached_func in downloads._memory_caches:
+            cached_func.cache_clear()
+        monkeypatch.setattr(station_metadata, "_get_api", DownApi)
+        assert list(station_metadata.get_buoy_metadata().index) == ["41001"]
+
+    def test_get_historical_bounds_monthly_only(self, station_table, monkeypatch):
+        """Test that stations with only monthly files have no historical bounds."""
+        class FakeApi:
+            def available_historical(self, station_id, as_df):
+                return {"Standard meteorological data": {"Jan 2026": "url"}}
+
+        monkeypatch.setattr(station_metadata, "_get_api", FakeApi)
+
+        min_year, max_year = station_metadata.get_historical_bounds("41001")["41001"]
+
+        assert np.isnan(min_year) and np.isnan(max_year)
+
+    def test_historical_listing_scraper_error(self, station_table, monkeypatch):
+        """Test that a station page the listing scraper cannot parse gives NaN bounds."""
+        class FakeApi:
+            def available_historical(self, station_id, as_df):
+                if station_id == "51001":
+                    # What ndbc_api raises on a page without a historical data section
+                    raise AttributeError("'NoneType' object has no attribute 'find_next_siblings'")
+                return {"Standard meteorological data": {"1976": "url", "2024": "url"}}
+
+        monkeypatch.setattr(station_metadata, "_get_api", FakeApi)
+
+        min_year, max_year = station_metadata.get_historical_bounds("51001")["51001"]
+        assert np.isnan(min_year) and np.isnan(max_year)
+
+        # The station is dropped without aborting the other stations
+        stations = station_metadata.get_buoy_stations()
+        assert list(stations.station_id.values) == ["41001"]
+
+    def test_get_historical_bounds_batched(self, station_table, monkeypatch):
+        """Test looking up the bounds of several stations in one call."""
+        class FakeApi:
+            def available_historical(self, station_id, as_df):
+                if station_id == "51001":
+                    return {}
+                return {"Standard meteorological data": {"1976": "url", "2024": "url"}}
+
+        monkeypatch.setattr(station_metadata, "_get_api", FakeApi)
+
+        bounds = station_metadata.get_historical_bounds(["51001", "41001"])
+
+        assert list(bounds) == ["51001", "41001"]
+        assert bounds["41001"] == ("1976", "2024")
+        assert np.isnan(bounds["51001"][0])
+
+    def test_parse_location(self):
+        """Test converting NDBC LOCATION strings to signed coordinates."""
+        location = pd.Series([
+            "17.869 N 66.532 W (17&#176;52'9\" N 66&#176;31'55\" W)",
+            "33.850 S 151.200 E",
+            "unknown",
+        ])
+
+        latitude, longitude = station_metadata._parse_location(location)
+
+        np.testing.assert_array_equal(latitude[:2], [17.869, -33.85])
+        np.testing.assert_array_equal(longitude[:2], [-66.532, 151.2])
+        assert np.isnan(latitude[2]) and np.isnan(longitude[2])
 
 
 class TestGeographicFilters:
@@ -97,17 +240,19 @@ class TestGeographicFilters:
 
     def test_box_filter_global(self):
         """Test box filter with global bounds (no filtering)."""
-        # Create a simple test dataset
-        ds = xr.Dataset({
-            "latitude": (["station_id"], [40.0, 42.0, 38.0]),
-            "longitude": (["station_id"], [-70.0, -72.0, -68.0]),
-            "station_id": ["A", "B", "C"]
-        })
+        # Stations spread over the globe, including its edges
+        ds = xr.Dataset(
+            {
+                "latitude": (["station_id"], [0.0, 10.0, -10.0, 90.0, -90.0]),
+                "longitude": (["station_id"], [0.0, 100.0, -100.0, 180.0, -180.0]),
+            },
+            coords={"station_id": ["a", "b", "c", "d", "e"]}
+        )
 
         filtered = geographic_filters.box_filter_buoys(ds)
 
         # Should return all stations
-        assert len(filtered.station_id) == 3
+        assert len(filtered.station_id) == 5
 
     def test_box_filter_custom_region(self):
         """Test box filter with custom region."""
@@ -131,6 +276,40 @@ class TestGeographicFilters:
         # Station C should be filtered out
         assert "C" not in filtered.station_id.values
 
+        # Same result as masking the whole dataset with where(drop=True)
+        in_box = (ds.longitude >= -75) & (ds.longitude <= -65) & (ds.latitude >= 35) & (ds.latitude <= 45)
+        xr.testing.assert_identical(filtered, ds.where(in_box, drop=True))
+
+    def test_box_filter_keeps_time_series(self):
+        """Test that data variables of the kept stations are unchanged."""
+        ds = xr.Dataset({
+            "latitude": (["station_id"], [40.0, 30.0]),
+            "longitude": (["station_id"], [-70.0, -60.0]),
+            "WTMP": (["station_id", "time"], [[1.0, 2.0], [3.0, 4.0]]),
+            "station_id": ["A", "B"],
+            "time": TIME_2
+        })
+
+        filtered = geographic_filters.box_filter_buoys(ds, lon1=-75, lon2=-65)
+
+        assert list(filtered.station_id.values) == ["A"]
+        assert filtered.sizes["time"] == 2
+        assert list(filtered["WTMP"].sel(station_id="A").values) == [1.0, 2.0]
+
+    def test_box_filter_time_varying_positions(self):
+        """Test that positions varying along time fall back to masking with where."""
+        ds = xr.Dataset({
+            "latitude": (["station_id", "time"], [[40.0, 41.0], [30.0, 40.0]]),
+            "longitude": (["station_id", "time"], [[-70.0, -70.0], [-60.0, -70.0]]),
+            "station_id": ["A", "B"],
+            "time": TIME_2
+        })
+
+        filtered = geographic_filters.box_filter_buoys(ds, lon1=-75, lon2=-65, lat1=35, lat2=45)
+
+        assert list(filtered.station_id.values) == ["A", "B"]
+        assert np.isnan(filtered["latitude"].sel(station_id="B").values[0])
+
     def test_filter_by_region_wrapper(self):
         """Test the user-facing filter_by_region function."""
         ds = xr.Dataset({
@@ -150,3 +329,536 @@ class TestGeographicFilters:
         # Only station A should remain
         assert len(filtered.station_id) == 1
         assert filtered.station_id.values[0] == "A"
+
+
+# Excerpt of an NDBC standard meteorological file with a units row
+STDMET_TEXT = b"""\
+#YY  MM DD hh mm WDIR WSPD GST  WVHT   DPD   APD MWD   PRES  ATMP  WTMP  DEWP  VIS  TIDE
+#yr  mo dy hr mn degT m/s  m/s     m   sec   sec degT   hPa  degC  degC  degC  nmi    ft
+2020 01 01 00 00 999 99.0 99.0 99.00 99.00 99.00 999 1017.5  12.3  14.1 999.0 99.0 99.00
+2020 01 01 12 00 130  2.1  3.0 99.00 99.00 99.00 999 1017.2  12.0  14.3 999.0 99.0 99.00
+2020 01 02 00 00 140  2.5  3.4 99.00 99.00 99.00 999 1016.9  11.8 999.0 999.0 99.0 99.00
+"""
+
+
+class TestDataRetrieval:
+    """Test record assembly with the per-year download replaced by fake data."""
+
+    @staticmethod
+    def fake_links(station_id):
+        """Return links for 2019 and 2020, or none for station "unlisted"."""
+        if station_id == "unlisted":
+            raise KeyError(station_id)
+        return {"2019": f"{station_id}/2019.txt", "2020": f"{station_id}/2020.txt"}
+
+    @staticmethod
+    def fake_year(yr, station_id="tplm2", display_error=False, slink=None, required_variable=None):
+        """Return two hourly records on Jan 1 and one on Jan 2, or nothing for station "empty"."""
+        if station_id == "empty":
+            return None
+        time = pd.DatetimeIndex([f"{yr}-01-01 00:00", f"{yr}-01-01 01:00", f"{yr}-01-02 00:00"], name="time")
+        return pd.DataFrame({"WTMP": [float(yr), float(yr) + 1, float(yr)]}, index=time)
+
+    def test_historical_listing_shared(self, station_table, monkeypatch):
+        """Test that bounds and download links reuse a single API call per station."""
+        calls = []
+
+        class FakeApi:
+            def available_historical(self, station_id, as_df):
+                calls.append(station_id)
+                url = "https://www.ndbc.noaa.gov/download_data.php?filename=41001{}.txt.gz"
+                return {
+                    "Continuous winds data": {"2020": url.format("c2020")},
+                    "Standard meteorological data": {
+                        "2019": url.format("h2019"), "2020": url.format("h2020"), "Jan 2026": "url"
+                    },
+                }
+
+        monkeypatch.setattr(station_metadata, "_get_api", FakeApi)
+
+        bounds = station_metadata.get_historical_bounds("41001")
+        links = data_retrieval._historical_links("41001")
+
+        assert calls == ["41001"]
+        assert bounds == {"41001": ("2019", "2020")}
+        assert links["2020"].endswith("view_text_file.php?filename=41001h2020.txt.gz")
+
+    def test_parse_historical_text_units_row(self):
+        """Test that the units row is detected and skipped."""
+        sdf = data_retrieval._parse_historical_text(STDMET_TEXT)
+
+        assert len(sdf) == 3
+        assert sdf["WTMP"].iloc[0] == 14.1
+
+    def test_parse_historical_text_without_units_row(self):
+        """Test parsing older files that have a single header row."""
+        lines = STDMET_TEXT.splitlines(keepends=True)
+        sdf = data_retrieval._parse_historical_text(lines[0] + b"".join(lines[2:]))
+
+        assert len(sdf) == 3
+        assert sdf["PRES"].iloc[1] == 1017.2
+
+    def test_parse_historical_text_matches_pandas(self, monkeypatch):
+        """Test that the pyarrow reader gives the same values as pandas."""
+        pytest.importorskip("pyarrow")
+        arrow = data_retrieval._parse_historical_text(STDMET_TEXT)
+        monkeypatch.setattr(data_retrieval, "pa_csv", None)
+        pandas = data_retrieval._parse_historical_text(STDMET_TEXT)
+
+        pd.testing.assert_frame_equal(arrow, pandas, check_dtype=False)
+
+    def test_parse_historical_text_arrow_fallback(self, monkeypatch):
+        """Test that files pyarrow rejects are parsed by pandas instead."""
+        pa = pytest.importorskip("pyarrow")
+        expected = data_retrieval._parse_historical_text(STDMET_TEXT)
+
+        def invalid(*args, **kwargs):
+            raise pa.ArrowInvalid("CSV parse error")
+
+        monkeypatch.setattr(data_retrieval.pa_csv, "read_csv", invalid)
+        sdf = data_retrieval._parse_historical_text(STDMET_TEXT)
+
+        pd.testing.assert_frame_equal(sdf, expected, check_dtype=False)
+
+    def test_mask_missing_values(self):
+        """Test that missing-value markers are masked in observation columns only."""
+        sdf = pd.DataFrame({
+            "YY": [99, 99],
+            "WDIR": [999, 99],
+            "PRES": [9999.0, 999.0],
+            "WTMP": [14.1, 99.0],
+            "OTHER": [9999.0, 1.0],
+        })
+
+        result = data_retrieval._mask_missing_values(sdf)
+
+        assert list(result["YY"]) == [99, 99]
+        assert result["WTMP"].dtype == np.float32
+        assert result[["WDIR", "PRES", "WTMP", "OTHER"]].isna().sum().sum() == 4
+        # Valid values that equal another column's marker are kept
+        assert result["WDIR"].iloc[1] == 99
+        assert result["PRES"].iloc[1] == 999
+
+    def test_compose_datetimes(self):
+        """Test that datetimes match pandas' parsing of the date columns."""
+        sdf = pd.DataFrame({
+            "year": [1999, 2020, 2020],
+            "month": [12, 2, 3],
+            "day": [31, 29, 1],
+            "hour": [23, 0, 12],
+            "minute": [50, 10, 0],
+        })
+
+        times = data_retrieval._compose_datetimes(sdf)
+
+        expected = pd.to_datetime(sdf).to_numpy(dtype="datetime64[ns]")
+        np.testing.assert_array_equal(times, expected)
+
+    @pytest.fixture
+    def streamed_file(self, monkeypatch):
+        """Serve STDMET_TEXT through a fake streaming session, recording the chunks read."""
+        served = []
+
+        class FakeResponse:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def raise_for_status(self):
+                pass
+
+            def iter_content(self, chunk_size):
+                for start in range(0, len(STDMET_TEXT), 16):
+                    served.append(STDMET_TEXT[start:start + 16])
+                    yield served[-1]
+
+        class FakeSession:
+            def get(self, url, stream, timeout):
+                assert stream
+                return FakeResponse()
+
+        monkeypatch.setattr(data_retrieval, "get_session", FakeSession)
+        return served
+
+    def test_fetch_and_sniff(self, streamed_file):
+        """Test that a streamed download is read whole and its units row detected."""
+        body, has_units_row = data_retrieval._fetch_and_sniff("A/2020.txt")
+
+        assert body == STDMET_TEXT
+        assert has_units_row
+
+    def test_fetch_and_sniff_required_variable(self, streamed_file):
+        """Test that files without the required variable stop after the header."""
+        assert data_retrieval._fetch_and_sniff("A/2020.txt", required_variable="WTMP") is not None
+        streamed_file.clear()
+
+        assert data_retrieval._fetch_and_sniff("A/2020.txt", required_variable="SST") is None
+        assert len(b"".join(streamed_file)) < len(STDMET_TEXT)
+
+    def test_extract_historical_year_download_error(self, monkeypatch):
+        """Test that HTTP errors give None instead of raising."""
+        import requests
+
+        def failing_download(url, required_variable=None):
+            raise requests.HTTPError("404 Client Error")
+
+        monkeypatch.setattr(data_retrieval, "_fetch_and_sniff", failing_download)
+
+        assert data_retrieval._read_historical_year(2020, "A", slink="A/2020.txt") is None
+
+    def test_extract_historical_year_unexpected_error(self, monkeypatch):
+        """Test that errors other than missing or malformed data propagate."""
+        def broken_download(url, required_variable=None):
+            raise RuntimeError("bug")
+
+        monkeypatch.setattr(data_retrieval, "_fetch_and_sniff", broken_download)
+
+        with pytest.raises(RuntimeError):
+            data_retrieval._read_historical_year(2020, "A", slink="A/2020.txt")
+
+    @pytest.mark.parametrize("backend", ["thread", "process"])
+    def test_parallel_map_backends(self, backend):
+        """Test that both pool backends return results in input order."""
+        items = list(range(-20, 0))
+        assert data_retrieval._parallel_map(abs, items, backend=backend, disable=True) == [abs(i) for i in items]
+
+    def test_process_backend_downloads(self):
+        """Test that download tasks run in worker processes with their own HTTP session."""
+        import functools
+        import http.server
+        import threading
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(STDMET_TEXT)))
+                self.end_headers()
+                self.wfile.write(STDMET_TEXT)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/A/2020.txt"
+        try:
+            # Leave a pooled connection open in the parent's session before forking
+            downloads.get_session().get(url, timeout=10).raise_for_status()
+
+            tasks = [("A", 2020, url)] * 4
+            fetch = functools.partial(data_retrieval._fetch_task, required_variable="WTMP")
+            results = data_retrieval._parallel_map(fetch, tasks, backend="process", disable=True)
+        finally:
+            server.shutdown()
+            server.server_close()
+            downloads.get_session.cache_clear()
+
+        assert all(isinstance(sdf, pd.DataFrame) for sdf in results)
+        assert "WTMP" in results[0].columns
+        for sdf in results[1:]:
+            pd.testing.assert_frame_equal(sdf, results[0])
+
+    def test_parallel_map_error_cancels_pending(self):
+        """Test that an error stops the queued tasks instead of running all of them."""
+        import threading
+        import time
+
+        calls = []
+        lock = threading.Lock()
+
+        def task(i):
+            with lock:
+                calls.append(i)
+            if i == 0:
+                raise RuntimeError("bug")
+            time.sleep(0.01)
+            return i
+
+        items = list(range(2000))
+        with pytest.raises(RuntimeError):
+            data_retrieval._parallel_map(task, items, disable=True)
+
+        assert len(calls) < len(items)
+
+    def test_parallel_map_invalid_backend(self):
+        """Test that an unknown backend raises ValueError."""
+        with pytest.raises(ValueError):
+            data_retrieval._parallel_map(abs, [1], backend="cluster", disable=True)
+
+    def test_get_station_records(self, monkeypatch):
+        """Test that yearly results are grouped per station and merged."""
+        monkeypatch.setattr(data_retrieval, "_historical_links", self.fake_links)
+        monkeypatch.setattr(data_retrieval, "_read_historical_year", self.fake_year)
+
+        ds = data_retrieval.get_station_records(["A", "empty", "unlisted", "B"], [2019, 2020])
+
+        assert list(ds.station_id.values) == ["A", "B"]
+        # Only the days spanned by each yearly file, without the gap between them
+        np.testing.assert_array_equal(
+            ds.time.values,
+            pd.to_datetime(["2019-01-01", "2019-01-02", "2020-01-01", "2020-01-02"]).to_numpy(dtype="datetime64[ns]")
+        )
+        assert ds["WTMP"].sel(station_id="B", time="2020-01-01").values == 2020.5
+        assert ds["WTMP"].sel(station_id="B", time="2020-01-02").values == 2020.0
+
+    def test_get_station_records_single_year(self, monkeypatch):
+        """Test that stations with a single year of data are kept."""
+        monkeypatch.setattr(data_retrieval, "_historical_links", self.fake_links)
+        monkeypatch.setattr(data_retrieval, "_read_historical_year", self.fake_year)
+
+        ds = data_retrieval.get_station_records(["A"], [2020], debugging=True)
+
+        assert list(ds.station_id.values) == ["A"]
+        assert ds.sizes["time"] == 2
+
+    def test_get_station_records_weekly(self, monkeypatch):
+        """Test resampling to a coarser rate than the records."""
+        monkeypatch.setattr(data_retrieval, "_historical_links", self.fake_links)
+        monkeypatch.setattr(data_retrieval, "_read_historical_year", self.fake_year)
+
+        ds = data_retrieval.get_station_records(["A"], [2020], sample_rate="W")
+
+        assert ds.sizes["time"] == 1
+        assert ds["WTMP"].values[0, 0] == pytest.approx((2020 + 2021 + 2020) / 3)
+
+    def test_get_station_records_unlisted_years(self, monkeypatch):
+        """Test that years without a historical file are not downloaded."""
+        requested = []
+
+        def record_year(yr, slink=None, **kwargs):
+            requested.append(slink)
+            return self.fake_year(yr, **kwargs)
+
+        monkeypatch.setattr(data_retrieval, "_historical_links", self.fake_links)
+        monkeypatch.setattr(data_retrieval, "_read_historical_year", record_year)
+
+        data_retrieval.get_station_records(["A"], [2018, 2019, 2020])
+
+        assert sorted(requested) == ["A/2019.txt", "A/2020.txt"]
+
+    def test_combine_station_years_skipped_files(self, streamed_file, caplog):
+        """Test that files skipped for a missing variable are not reported as failures."""
+        skipped = data_retrieval._read_historical_year(2020, "A", slink="A/2020.txt", required_variable="SST")
+        read = data_retrieval._read_historical_year(2020, "A", slink="A/2020.txt")
+
+        with caplog.at_level("WARNING", logger=data_retrieval.logger.name):
+            sdf = data_retrieval._combine_station_years("A", [(2019, skipped), (2020, read)], "D")
+        assert not caplog.records
+        pd.testing.assert_frame_equal(sdf, data_retrieval._combine_station_years("A", [(2020, read)], "D"))
+
+        with caplog.at_level("WARNING", logger=data_retrieval.logger.name):
+            data_retrieval._combine_station_years("A", [(2019, None), (2020, read)], "D")
+        assert "1 of 2" in caplog.text
+
+    def test_stack_stations(self):
+        """Test that stations with different times and variables are aligned."""
+        frames = {
+            "A": pd.DataFrame(
+                {"WTMP": [1.0, 2.0]}, index=pd.date_range("2020-01-01", periods=2, name="time")
+            ),
+            "B": pd.DataFrame(
+                {"WTMP": [3.0], "ATMP": [4.0]}, index=pd.date_range("2020-01-03", periods=1, name="time")
+            ),
+        }
+
+        ds = data_retrieval._stack_stations(frames)
+
+        assert list(ds.station_id.values) == ["A", "B"]
+        assert list(ds.data_vars) == ["WTMP", "ATMP"]
+        assert ds["WTMP"].dtype == np.float32
+        assert ds.sizes["time"] == 3
+        np.testing.assert_array_equal(ds["WTMP"].values, [[1.0, 2.0, np.nan], [np.nan, np.nan, 3.0]])
+        assert np.isnan(ds["ATMP"].sel(station_id="A")).all()
+
+    def test_get_station_records_no_data(self, monkeypatch):
+        """Test that an empty dataset is returned when no station has data."""
+        monkeypatch.setattr(data_retrieval, "_historical_links", self.fake_links)
+        monkeypatch.setattr(data_retrieval, "_read_historical_year", self.fake_year)
+
+        ds = data_retrieval.get_station_records(["empty"], [2020])
+
+        assert len(ds.data_vars) == 0
+
+
+class TestCoreAPI:
+    """Test the user-facing API with downloads replaced by fake data."""
+
+    def test_fetch_data_with_reference_stations(self, monkeypatch):
+        """Test that given reference stations are used for locations."""
+        def fake_records(station_list, years, sample_rate="D", debugging=False):
+            return xr.Dataset(
+                {"WTMP": (["station_id", "time"], np.ones((1, 2)))},
+                coords={"station_id": station_list, "time": TIME_2}
+            )
+
+        def no_station_table():
+            raise AssertionError("station table should not be downloaded")
+
+        monkeypatch.setattr(data_retrieval, "get_station_records", fake_records)
+        monkeypatch.setattr(station_metadata, "_get_station_locations", no_station_table)
+        reference = xr.Dataset({
+            "latitude": (["station_id"], [40.0]),
+            "longitude": (["station_id"], [-70.0]),
+            "station_id": ["A"]
+        })
+
+        data = xbuoy.fetch_data("A", 2020, reference_stations=reference)
+
+        assert data["latitude"].values[0] == 40.0
+
+    def test_fetch_data_locations_from_station_table(self, station_table, monkeypatch):
+        """Test that locations come from the station table without bounds lookups."""
+        def fake_records(station_list, years, sample_rate="D", debugging=False):
+            return xr.Dataset(
+                {"WTMP": (["station_id", "time"], np.ones((1, 2)))},
+                coords={"station_id": station_list, "time": TIME_2}
+            )
+
+        monkeypatch.setattr(data_retrieval, "get_station_records", fake_records)
+        monkeypatch.setattr(station_metadata, "_fetch_bounds", None)
+
+        data = xbuoy.fetch_data("41001", 2020)
+
+        assert data["latitude"].values[0] == 34.724
+
+
+class TestDownloads:
+    """Test on-disk and in-memory caching helpers."""
+
+    def test_cache_dir_from_environment(self, tmp_path, monkeypatch):
+        """Test that XBUOY_CACHE_DIR sets the cache location."""
+        monkeypatch.setenv("XBUOY_CACHE_DIR", str(tmp_path))
+
+        assert xbuoy.get_cache_dir() == tmp_path
+
+    def test_cached_download(self, tmp_path, monkeypatch):
+        """Test that a downloaded file is served from disk on later calls."""
+        monkeypatch.setenv("XBUOY_CACHE_DIR", str(tmp_path / "cache"))
+        source = tmp_path / "station_table.txt"
+        source.write_text("first")
+        url = source.as_uri()
+
+        assert downloads.cached_download(url) == b"first"
+        source.write_text("second")
+        assert downloads.cached_download(url) == b"first"
+        # Stale entries are downloaded again
+        assert downloads.cached_download(url, max_age=0) == b"second"
+
+    def test_cached_download_http(self, tmp_path, monkeypatch):
+        """Test that HTTP downloads go through the shared session and failures are not cached."""
+        import http.server
+        import threading
+
+        import requests
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = b"table" if self.path == "/station_table.txt" else b""
+                self.send_response(200 if body else 404)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        monkeypatch.setenv("XBUOY_CACHE_DIR", str(tmp_path / "cache"))
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        try:
+            assert downloads.cached_download(f"{base}/station_table.txt") == b"table"
+            with pytest.raises(requests.HTTPError):
+                downloads.cached_download(f"{base}/missing.txt")
+        finally:
+            server.shutdown()
+            server.server_close()
+            downloads.get_session.cache_clear()
+
+        assert not downloads._cache_path(f"{base}/missing.txt", suffix=".txt").exists()
+
+    def test_cached_call_and_clear_cache(self, tmp_path, monkeypatch):
+        """Test that results are pickled on disk and removed by clear_cache."""
+        monkeypatch.setenv("XBUOY_CACHE_DIR", str(tmp_path))
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"2020": "url"}
+
+        assert downloads.cached_call("key", compute) == {"2020": "url"}
+        assert downloads.cached_call("key", compute) == {"2020": "url"}
+        assert len(calls) == 1
+
+        (tmp_path / "notes.txt").write_text("keep me")
+        xbuoy.clear_cache()
+
+        assert downloads.cached_call("key", compute) == {"2020": "url"}
+        assert len(calls) == 2
+        assert (tmp_path / "notes.txt").exists()
+
+    def test_memoize_cleared_by_clear_cache(self, tmp_path, monkeypatch):
+        """Test that memoized functions are reset by clear_cache."""
+        monkeypatch.setenv("XBUOY_CACHE_DIR", str(tmp_path))
+        calls = []
+
+        @downloads.memoize(maxsize=1)
+        def load():
+            calls.append(1)
+            return len(calls)
+
+        assert load() == 1
+        assert load() == 1
+        xbuoy.clear_cache()
+        assert load() == 2
+
+
+class TestPlotting:
+    """Test plotting functions without rendering to screen."""
+
+    def test_plot_stations_single_collection(self):
+        """Test that station locations are drawn with one scatter collection."""
+        pytest.importorskip("cartopy")
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import PathCollection
+        from xbuoy import plotting
+
+        ds = xr.Dataset({
+            "latitude": (["station_id"], [40.0, 42.0, 38.0]),
+            "longitude": (["station_id"], [-70.0, -72.0, -68.0]),
+            "station_id": ["A", "B", "C"]
+        })
+
+        fig, ax = plotting.plot_stations(ds)
+
+        scatters = [c for c in ax.collections if isinstance(c, PathCollection)]
+        assert len(scatters) == 1
+        assert len(scatters[0].get_offsets()) == 3
+        assert scatters[0].get_rasterized()
+        plt.close(fig)
+
+    def test_plot_stations_density(self):
+        """Test that large point sets are drawn as one aggregated image."""
+        pytest.importorskip("cartopy")
+        pytest.importorskip("datashader")
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from xbuoy import plotting
+
+        n = 50
+        ds = xr.Dataset({
+            "latitude": (["station_id"], np.linspace(-60, 60, n)),
+            "longitude": (["station_id"], np.linspace(-170, 170, n)),
+            "WTMP": (["station_id"], np.linspace(0, 30, n)),
+            "station_id": [str(i) for i in range(n)]
+        })
+
+        fig, ax = plotting.plot_stations(ds, variable="WTMP", density_threshold=10)
+
+        assert len(ax.get_images()) == 1
+        plt.close(fig)
@@ -15,66 +15,53 @@ from xbuoy import core, station_metadata, data_processing, geographic_filters
 pytestmark = pytest.mark.integration
 
 
-class TestCoreAPI:
-    """Test the high-level user-facing API."""
+def assert_station_schema(stations):
+    """Check the variables shared by both formats of the station list."""
+    names = stations.data_vars if isinstance(stations, xr.Dataset) else stations.columns
+    for name in ["latitude", "longitude", "min_year", "max_year"]:
+        assert name in names
+    assert stations["latitude"].size > 0
 
-    def test_list_stations(self):
-        """Test listing all buoy stations."""
-        stations = xbuoy.list_stations()
 
-        assert isinstance(stations, xr.Dataset)
-        assert "latitude" in stations.data_vars
-        assert "longitude" in stations.data_vars
-        assert "min_year" in stations.data_vars
-        assert "max_year" in stations.data_vars
-        assert len(stations.station_id) > 0
+def assert_in_bbox(ds, lon_min, lon_max, lat_min, lat_max):
+    """Check that every station of ds lies inside the box, in one combined mask."""
+    lat = ds.latitude.values
+    lon = ds.longitude.values
+    assert np.all((lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max))
 
-    def test_list_stations_pandas(self):
-        """Test listing stations as pandas DataFrame."""
-        stations = xbuoy.list_stations(data_format="pandas")
 
-        assert isinstance(stations, pd.DataFrame)
-        assert "latitude" in stations.columns
-        assert "longitude" in stations.columns
+@pytest.mark.usefixtures("buoy_metadata")
+class TestCoreAPI:
+    """Test the high-level user-facing API."""
 
-    def test_list_stations_with_region(self):
+    @pytest.mark.parametrize("fixture, expected_type", [
+        ("all_stations", xr.Dataset),
+        ("all_stations_pandas", pd.DataFrame),
+    ])
+    def test_list_stations_format(self, request, fixture, expected_type):
+        """Test listing all buoy stations in each data format."""
+        stations = request.getfixturevalue(fixture)
+
+        assert isinstance(stations, expected_type)
+        assert_station_schema(stations)
+
+    @pytest.mark.parametrize("region", [
+        {"lon_min": -85, "lon_max": -60, "lat_min": 10, "lat_max": 25},  # Caribbean
+        {"lon_min": -80, "lon_max": -65, "lat_min": 25, "lat_max": 45},  # US East Coast
+    ])
+    def test_list_stations_with_region(self, all_stations, region):
         """Test listing stations filtered by region."""
-        # Test Caribbean region
-        region = {
-            'lon_min': -85,
-            'lon_max': -60,
-            'lat_min': 10,
-            'lat_max': 25
-        }
         stations = xbuoy.list_stations(region=region)
 
         assert isinstance(stations, xr.Dataset)
         # All stations should be within the specified region
-        assert (stations.latitude >= 10).all()
-        assert (stations.latitude <= 25).all()
-        assert (stations.longitude >= -85).all()
-        assert (stations.longitude <= -60).all()
-
-    def test_filter_by_region(self):
-        """Test filtering a dataset by geographic region."""
-        stations = xbuoy.list_stations()
-
-        # Filter to US East Coast
-        filtered = xbuoy.filter_by_region(
-            stations,
-            lon_min=-80,
-            lon_max=-65,
-            lat_min=25,
-            lat_max=45
-        )
-
-        assert isinstance(filtered, xr.Dataset)
-        assert len(filtered.station_id) <= len(stations.station_id)
-        # Check bounds
-        assert (filtered.latitude >= 25).all()
-        assert (filtered.latitude <= 45).all()
+        assert_in_bbox(stations, **region)
+        # Same stations as filtering the full list locally
+        expected = xbuoy.filter_by_region(all_stations, **region)
+        assert list(stations.station_id.values) == list(expected.station_id.values)
 
 
+@pytest.mark.usefixtures("buoy_metadata")
 class TestStationMetadata:
     """Test station metadata functions."""
 
@@ -105,92 +92,59 @@ class TestStationMetadata:
         assert len(bounds["tplm2"]) == 2
 
 
+@pytest.mark.usefixtures("buoy_metadata")
 class TestGeographicFilters:
     """Test geographic filtering functions."""
 
-    def test_box_filter_global(self):
+    def test_box_filter_global(self, all_stations):
         """Test box filter with global bounds (no filtering)."""
-        stations = xbuoy.list_stations()
+        stations = all_stations
         filtered = geographic_filters.box_filter_buoys(stations)
 
         # Should return all stations
         assert len(filtered.station_id) == len(stations.station_id)
 
-    def test_box_filter_custom_region(self):
-        """Test box filter with custom region."""
-        stations = xbuoy.list_stations()
-
-        # Filter to a small region
-        filtered = geographic_filters.box_filter_buoys(
-            stations,
-            lon1=-75,
-            lon2=-70,
-            lat1=35,
-            lat2=40
-        )
+    @pytest.mark.parametrize("filter_func, kwargs, bounds", [
+        # US East Coast through the user-facing wrapper
+        (xbuoy.filter_by_region, dict(lon_min=-80, lon_max=-65, lat_min=25, lat_max=45), (-80, -65, 25, 45)),
+        # A small region through the underlying filter
+        (geographic_filters.box_filter_buoys, dict(lon1=-75, lon2=-70, lat1=35, lat2=40), (-75, -70, 35, 40)),
+    ])
+    def test_box_filters(self, all_stations, filter_func, kwargs, bounds):
+        """Test that region filters keep only the stations inside the box."""
+        filtered = filter_func(all_stations, **kwargs)
 
-        assert len(filtered.station_id) <= len(stations.station_id)
-        # All stations should be within bounds
-        assert (filtered.latitude >= 35).all()
-        assert (filtered.latitude <= 40).all()
+        assert isinstance(filtered, xr.Dataset)
+        assert len(filtered.station_id) <= len(all_stations.station_id)
+        assert_in_bbox(filtered, *bounds)
 
 
 class TestDataProcessing:
     """Test data processing functions."""
 
-    def test_add_variable_coverage(self):
+    def test_add_variable_coverage(self, wtmp_ds):
         """Test computing data coverage for a variable."""
-        # Create a simple test dataset
-        ds = xr.Dataset({
-            "WTMP": (["station_id", "time"], np.random.rand(3, 10)),
-            "station_id": ["A", "B", "C"],
-            "time": pd.date_range("2020-01-01", periods=10)
-        })
-
-        # Add some NaN values
-        ds["WTMP"].values[0, 0:5] = np.nan  # 50% coverage for station A
-
-        result = data_processing.add_variable_coverage(ds, varname="WTMP")
+        result = data_processing.add_variable_coverage(wtmp_ds.copy(), varname="WTMP")
 
         assert "WTMP_coverage" in result.data_vars
-        assert result["WTMP_coverage"].sel(station_id="A").values == 50.0
-        assert result["WTMP_coverage"].sel(station_id="B").values == 100.0
+        np.testing.assert_array_equal(result["WTMP_coverage"].values, [50.0, 100.0, 100.0])
 
-    def test_compute_data_coverage(self):
+    def test_compute_data_coverage(self, wspd_ds):
         """Test the compute_data_coverage alias function."""
-        # Create a simple test dataset
-        ds = xr.Dataset({
-            "WSPD": (["station_id", "time"], np.random.rand(2, 10)),
-            "station_id": ["A", "B"],
-            "time": pd.date_range("2020-01-01", periods=10)
-        })
-
-        result = data_processing.compute_data_coverage(ds, variable="WSPD")
+        result = data_processing.compute_data_coverage(wspd_ds.copy(), variable="WSPD")
 
         assert "WSPD_coverage" in result.data_vars
-        assert (result["WSPD_coverage"] == 100.0).all()
+        np.testing.assert_array_equal(result["WSPD_coverage"].values, np.full(2, 100.0))
 
-    def test_add_latitude_longitude(self):
+    def test_add_latitude_longitude(self, wspd_ds, latlon_reference):
         """Test adding lat/lon coordinates from reference dataset."""
-        # Create test datasets
-        data = xr.Dataset({
-            "WTMP": (["station_id", "time"], np.random.rand(2, 5)),
-            "station_id": ["A", "B"],
-            "time": pd.date_range("2020-01-01", periods=5)
-        })
-
-        reference = xr.Dataset({
-            "latitude": (["station_id"], [40.0, 42.0]),
-            "longitude": (["station_id"], [-70.0, -72.0]),
-            "station_id": ["A", "B"]
-        })
-
-        result = data_processing.add_latitude_longitude(data, reference)
+        result = data_processing.add_latitude_longitude(wspd_ds, latlon_reference)
 
         assert "latitude" in result.data_vars
         assert "longitude" in result.data_vars
-        assert result["latitude"].sel(station_id="A").values == 40.0
-        assert result["longitude"].sel(station_id="B").values == -72.0
+        assert list(result.station_id.values) == ["A", "B"]
+        np.testing.assert_array_equal(result["latitude"].values, [40.0, 42.0])
+        np.testing.assert_array_equal(result["longitude"].values, [-70.0, -72.0])
 
 
 class TestPackageImports:
@@ -203,14 +157,10 @@ class TestPackageImports:
 
     def test_core_functions_available(self):
         """Test that core API functions are available at package level."""
-        assert hasattr(xbuoy, "list_stations")
-        assert hasattr(xbuoy, "fetch_data")
-        assert hasattr(xbuoy, "filter_by_region")
-        assert hasattr(xbuoy, "plot_stations")
+        core_names = {"list_stations", "fetch_data", "filter_by_region", "plot_stations"}
+        assert core_names <= set(dir(xbuoy))
 
     def test_advanced_functions_available(self):
         """Test that advanced functions are still available."""
-        assert hasattr(xbuoy, "get_buoy_metadata")
-        assert hasattr(xbuoy, "get_buoy_stations")
-        assert hasattr(xbuoy, "box_filter_buoys")
-        assert hasattr(xbuoy, "compute_data_coverage")
+        advanced = {"get_buoy_metadata", "get_buoy_stations", "box_filter_buoys", "compute_data_coverage"}
+        assert advanced <= set(dir(xbuoy))